@@ -1,5 +1,7 @@
 import sys
 import os
+from functools import lru_cache
+
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
 from data_loader import FlitterDataLoader
@@ -11,7 +13,7 @@ def print_header():
     print("\nNETWORK EXPLORATION TOOL\n")
 
 
-def explore_node(node_id, analyzer, geo_analyzer):
+def explore_node(node_id, analyzer, get_geo_analyzer):
     info = analyzer.get_node_info(node_id)
 
     print(f"\nNODE DETAILS: {info['name']} (ID: {node_id})\n")
@@ -32,8 +34,7 @@ def explore_node(node_id, analyzer, geo_analyzer):
 
     print(f"Connections ({info['degree']} total):")
     neighbors = info['neighbors'][:20]
-    for i, neighbor_id in enumerate(neighbors, 1):
-        neighbor_info = analyzer.get_node_info(neighbor_id)
+    for i, neighbor_info in enumerate(analyzer.get_nodes_info(neighbors), 1):
         print(f"  {i:2d}. {neighbor_info['name']:20s} | Degree: {neighbor_info['degree']:3d} | City: {neighbor_info['city']}")
 
     if len(info['neighbors']) > 20:
@@ -51,7 +52,7 @@ def explore_node(node_id, analyzer, geo_analyzer):
         print("  Possible MIDDLEMAN (high betweenness centrality)")
 
     if info['degree'] >= 80:
-        int_connections = geo_analyzer.find_international_connections(analyzer.graph, node_id)
+        int_connections = get_geo_analyzer().find_international_connections(analyzer.graph, node_id)
         print("  Possible FEARLESS LEADER (degree >= 80)")
         print(f"    International reach: {int_connections} different cities")
 
@@ -64,9 +65,10 @@ def show_top_nodes_by_metric(analyzer, metric_name, top_n=20):
     print(f"{'Rank':<6} {'Name':<22} {'City':<15} {'Degree':<8} {'Metric Value'}")
     print("_" * 80)
 
-    for i, (node_id, value) in enumerate(top_nodes, 1):
-        info = analyzer.get_node_info(node_id)
-        print(f"{i:<6} {info['name']:<22} {info['city']:<15} {info['degree']:<8} {value:.6f}")
+    infos = analyzer.get_nodes_info([node_id for node_id, _ in top_nodes])
+    rows = [f"{i:<6} {info['name']:<22} {info['city']:<15} {info['degree']:<8} {value:.6f}"
+            for i, (info, (node_id, value)) in enumerate(zip(infos, top_nodes), 1)]
+    print("\n".join(rows))
 
 
 def show_nodes_by_degree_range(analyzer, min_deg, max_deg):
@@ -78,18 +80,58 @@ def show_nodes_by_degree_range(analyzer, min_deg, max_deg):
     print(f"{'Rank':<6} {'Name':<22} {'City':<15} {'Degree':<8} {'Betweenness'}")
     print("_" * 80)
 
-    for i, (node_id, degree) in enumerate(nodes[:50], 1):
-        info = analyzer.get_node_info(node_id)
-        print(f"{i:<6} {info['name']:<22} {info['city']:<15} {degree:<8} {info['betweenness_centrality']:.6f}")
+    infos = analyzer.get_nodes_info([node_id for node_id, _ in nodes[:50]])
+    rows = [f"{i:<6} {info['name']:<22} {info['city']:<15} {degree:<8} {info['betweenness_centrality']:.6f}"
+            for i, (info, (node_id, degree)) in enumerate(zip(infos, nodes[:50]), 1)]
+    print("\n".join(rows))
 
     if len(nodes) > 50:
         print(f"\n... and {len(nodes) - 50} more nodes")
 
 
-def interactive_mode(analyzer, geo_analyzer):
+def interactive_mode(analyzer, get_geo_analyzer):
     print("\nInteractive mode")
     print("Commands: node <id>, top <metric>, degree <min> <max>, help, quit\n")
 
+    def cmd_quit(parts):
+        return 'quit'
+
+    def cmd_help(parts):
+        print("\nCommands:")
+        print("node <id> - explore a node")
+        print("top <metric> [n] - show top nodes")
+        print("degree <min> <max> - filter by degree")
+        print("quit - exit")
+
+    def cmd_node(parts):
+        if len(parts) < 2:
+            print("need node id")
+        else:
+            explore_node(int(parts[1]), analyzer, get_geo_analyzer)
+
+    def cmd_top(parts):
+        if len(parts) < 2:
+            print("need metric name")
+        else:
+            metric = parts[1]
+            n = int(parts[2]) if len(parts) > 2 else 20
+            show_top_nodes_by_metric(analyzer, metric, n)
+
+    def cmd_degree(parts):
+        if len(parts) < 3:
+            print("need min and max")
+        else:
+            show_nodes_by_degree_range(analyzer, int(parts[1]), int(parts[2]))
+
+    handlers = {
+        'quit': cmd_quit,
+        'exit': cmd_quit,
+        'help': cmd_help,
+        'node': cmd_node,
+        'top': cmd_top,
+        'degree': cmd_degree,
+    }
+
     while True:
         try:
             cmd = input("> ").strip().lower()
@@ -98,38 +140,11 @@ def interactive_mode(analyzer, geo_analyzer):
 
             parts = cmd.split()
 
-            if parts[0] in ['quit', 'exit']:
-                break
-
-            elif parts[0] == 'help':
-                print("\nCommands:")
-                print("node <id> - explore a node")
-                print("top <metric> [n] - show top nodes")
-                print("degree <min> <max> - filter by degree")
-                print("quit - exit")
-
-            elif parts[0] == 'node':
-                if len(parts) < 2:
-                    print("need node id")
-                else:
-                    explore_node(int(parts[1]), analyzer, geo_analyzer)
-
-            elif parts[0] == 'top':
-                if len(parts) < 2:
-                    print("need metric name")
-                else:
-                    metric = parts[1]
-                    n = int(parts[2]) if len(parts) > 2 else 20
-                    show_top_nodes_by_metric(analyzer, metric, n)
-
-            elif parts[0] == 'degree':
-                if len(parts) < 3:
-                    print("need min and max")
-                else:
-                    show_nodes_by_degree_range(analyzer, int(parts[1]), int(parts[2]))
-
-            else:
+            handler = handlers.get(parts[0])
+            if handler is None:
                 print(f"unknown: {parts[0]} (type 'help')")
+            elif handler(parts) == 'quit':
+                break
 
         except ValueError:
             print("invalid input")
@@ -150,9 +165,11 @@ def main():
     print("Building network...")
     analyzer = SocialNetworkAnalyzer(data['links'], data['entities'], data['locations'])
     graph = analyzer.build_graph()
-    analyzer.calculate_all_metrics()
+    analyzer.calculate_all_metrics(approx=True)
 
-    geo_analyzer = GeospatialAnalyzer(data['locations'])
+    @lru_cache(maxsize=1)
+    def get_geo_analyzer():
+        return GeospatialAnalyzer(data['locations'])
 
     print("\nDATA LOADED SUCCESSFULLY\n")
     print(f"Network: {graph.number_of_nodes()} nodes, {graph.number_of_edges()} edges\n")
@@ -165,7 +182,7 @@ def main():
 
     show_nodes_by_degree_range(analyzer, 35, 45)
 
-    interactive_mode(analyzer, geo_analyzer)
+    interactive_mode(analyzer, get_geo_analyzer)
 
 
 if __name__ == "__main__":
@@ -1,3 +1,4 @@
+import io
 import sys
 import os
 from datetime import datetime
@@ -17,14 +18,25 @@ def print_header():
     print(f"\nAnalysis started: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
 
 
-def save_final_report(results, analyzer, geo_analyzer, output_path="outputs/reports"):
+def _best_by_score(results_iter):
+    best = None
+    best_score = 0
+    for result in results_iter:
+        if best is None or result['score'] > best_score:
+            best = result
+            best_score = result['score']
+    return best, best_score
+
+
+def save_final_report(results, analyzer, geo_analyzer, best_a=None, best_b=None, output_path="outputs/reports"):
     os.makedirs(output_path, exist_ok=True)
     report_file = os.path.join(output_path, "criminal_network_analysis_report.txt")
+    now_str = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
 
-    with open(report_file, 'w') as f:
+    with io.StringIO() as f:
         f.write("IEEE VAST 2009 MINI CHALLENGE - CRIMINAL NETWORK DETECTION\n")
         f.write("COMPREHENSIVE ANALYSIS REPORT\n\n")
-        f.write(f"Report generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
+        f.write(f"Report generated: {now_str}\n\n")
 
         f.write("\nEXECUTIVE SUMMARY\n\n")
         f.write("Objective: Identify criminal espionage network within Flitter social network\n")
@@ -49,12 +61,8 @@ def save_final_report(results, analyzer, geo_analyzer, output_path="outputs/repo
 
         f.write("\nSCENARIO A: SINGLE MIDDLEMAN (BORIS)\n\n")
 
-        if results['scenario_a']:
-            all_scenario_a_results = []
-            for result_list in results['scenario_a'].values():
-                all_scenario_a_results.extend(result_list)
-
-            result_a = max(all_scenario_a_results, key=lambda x: x['score'])
+        if best_a:
+            result_a = best_a
 
             f.write(f"Detection Score: {result_a['score']:.2f}\n\n")
             f.write("IDENTIFIED NETWORK MEMBERS:\n\n")
@@ -91,9 +99,8 @@ def save_final_report(results, analyzer, geo_analyzer, output_path="outputs/repo
 
         f.write("\nSCENARIO B: THREE MIDDLEMEN (BORIS, MORRIS, HORACE)\n\n")
 
-        if results['scenario_b']:
-            best_b = max(results['scenario_b'].items(), key=lambda x: x[1]['score'])
-            result_b = best_b[1]
+        if best_b:
+            result_b = best_b
 
             f.write(f"Detection Score: {result_b['score']:.2f}\n\n")
             f.write("IDENTIFIED NETWORK MEMBERS:\n\n")
@@ -133,15 +140,11 @@ def save_final_report(results, analyzer, geo_analyzer, output_path="outputs/repo
 
         f.write("\nCONCLUSION\n\n")
 
-        if results['scenario_a'] or results['scenario_b']:
+        if best_a or best_b:
             f.write("Criminal network structure successfully identified.\n\n")
 
-            all_a_scores = []
-            if results['scenario_a']:
-                for result_list in results['scenario_a'].values():
-                    all_a_scores.extend([r['score'] for r in result_list])
-            best_score_a = max(all_a_scores) if all_a_scores else 0
-            best_score_b = max([r['score'] for r in results['scenario_b'].values()]) if results['scenario_b'] else 0
+            best_score_a = best_a['score'] if best_a else 0
+            best_score_b = best_b['score'] if best_b else 0
 
             if best_score_a > best_score_b:
                 f.write(f"Most Likely Scenario: A (Single Middleman)\n")
@@ -161,6 +164,9 @@ def save_final_report(results, analyzer, geo_analyzer, output_path="outputs/repo
 
         f.write("END OF REPORT\n")
 
+        with open(report_file, 'w') as out:
+            out.write(f.getvalue())
+
     print(f"\nComprehensive report saved to {report_file}")
     return report_file
 
@@ -208,6 +214,12 @@ def main():
     detector = CriminalNetworkDetector(analyzer, geo_analyzer)
     results = detector.detect_all_patterns()
 
+    all_scenario_a = []
+    for result_list in results['scenario_a'].values():
+        all_scenario_a.extend(result_list)
+    best_a, _ = _best_by_score(all_scenario_a)
+    best_b, _ = _best_by_score(results['scenario_b'].values())
+
     print("\n\nSTEP 5: VISUALIZATION\n")
 
     visualizer = NetworkVisualizer(graph)
@@ -218,34 +230,24 @@ def main():
 
     visualizer.visualize_centrality_comparison(metrics)
 
-    if results['scenario_a']:
-        all_scenario_a = []
-        for result_list in results['scenario_a'].values():
-            all_scenario_a.extend(result_list)
-        best_a = max(all_scenario_a, key=lambda x: x['score'])
+    if best_a:
         visualizer.visualize_criminal_network(best_a, 'A')
 
-    if results['scenario_b']:
-        best_b = max(results['scenario_b'].items(), key=lambda x: x[1]['score'])[1]
+    if best_b:
         visualizer.visualize_criminal_network(best_b, 'B')
 
     print("\n\nSTEP 6: GENERATING FINAL REPORT\n")
 
-    report_path = save_final_report(results, analyzer, geo_analyzer)
+    report_path = save_final_report(results, analyzer, geo_analyzer, best_a, best_b)
 
     print("\n\nANALYSIS COMPLETE\n")
 
     print("\nResults:")
-    if results['scenario_a']:
-        all_a_scores = []
-        for result_list in results['scenario_a'].values():
-            all_a_scores.extend([r['score'] for r in result_list])
-        best_score_a = max(all_a_scores)
-        print(f"  Scenario A detected (Score: {best_score_a:.2f})")
-
-    if results['scenario_b']:
-        best_score_b = max([r['score'] for r in results['scenario_b'].values()])
-        print(f"  Scenario B detected (Score: {best_score_b:.2f})")
+    if best_a:
+        print(f"  Scenario A detected (Score: {best_a['score']:.2f})")
+
+    if best_b:
+        print(f"  Scenario B detected (Score: {best_b['score']:.2f})")
 
     print("\nOutput files saved to:")
     print(f"  - Visualizations: outputs/visualizations/")
@@ -1,6 +1,75 @@
+import heapq
+import io
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
 from itertools import combinations
+
+import networkx as nx
+import numpy as np
 import yaml
 
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+
+if njit is not None:
+    @njit(cache=True)
+    def _best_middleman_jit(candidate_idx, deg, betw, city_is_small):
+        best_i = -1
+        best_score = 0.0
+        for k in range(candidate_idx.shape[0]):
+            i = candidate_idx[k]
+            degree = deg[i]
+            betweenness = betw[i]
+            if 15 <= degree <= 70 and betweenness > 0.005:
+                score = betweenness * degree
+                if city_is_small[i]:
+                    score *= 1.3
+                if score > best_score:
+                    best_score = score
+                    best_i = i
+        return best_i
+
+    @njit(cache=True)
+    def _best_leader_jit(candidate_idx, deg, betw, city_is_large,
+                         min_contacts, deg_thresh, betw_thresh):
+        best_i = -1
+        best_score = 0.0
+        for k in range(candidate_idx.shape[0]):
+            i = candidate_idx[k]
+            degree = deg[i]
+            betweenness = betw[i]
+            if degree >= min_contacts and (degree >= deg_thresh or betweenness >= betw_thresh):
+                score = degree + betweenness * 1000.0
+                if city_is_large[i]:
+                    score *= 1.2
+                if score > best_score:
+                    best_score = score
+                    best_i = i
+        return best_i
+else:
+    _best_middleman_jit = None
+    _best_leader_jit = None
+
+
+def _analyze_employee(detector, emp_id):
+    # Worker for the per-candidate fan-out: stdout is buffered so the
+    # parent can replay each candidate's report in order.
+    buf = io.StringIO()
+    with redirect_stdout(buf):
+        # Both scenarios start from the same handler candidates; find them
+        # once and bail out early when there can be no valid triple.
+        handlers = detector._find_handler_candidates(detector.analyzer.get_neighbors(emp_id))
+        if len(handlers) < 3:
+            print(f"Not enough handlers ({len(handlers)} < 3)")
+            scenario_a_results, scenario_b_result = [], None
+        else:
+            scenario_a_results = detector.detect_scenario_a(emp_id, handlers=handlers)
+            scenario_b_result = detector.detect_scenario_b(emp_id, handlers=handlers)
+    return emp_id, scenario_a_results, scenario_b_result, buf.getvalue()
+
 
 class CriminalNetworkDetector:
     def __init__(self, analyzer, geospatial_analyzer, config_path="config/analysis_config.yaml"):
@@ -15,6 +84,45 @@ class CriminalNetworkDetector:
         self.middleman_candidates = {}
         self.leader_candidates = []
 
+        self._leader_thresholds = None
+        self._neighbor_sets = {}
+        self._middleman_cache = {}
+        self._leader_cache = {}
+        self._build_node_arrays()
+
+    def _build_node_arrays(self):
+        graph = self.analyzer.graph
+        metrics = self.analyzer.metrics
+
+        nodes = list(graph.nodes())
+        n = len(nodes)
+
+        self._nodes = nodes
+        self._idx = {node: i for i, node in enumerate(nodes)}
+        self._deg = np.fromiter((graph.degree(node) for node in nodes), dtype=np.int64, count=n)
+
+        clustering = metrics.get('clustering_coefficient', {})
+        if self.analyzer.betweenness_array is not None and len(self.analyzer.betweenness_array) == n:
+            self._betw = self.analyzer.betweenness_array
+        else:
+            betweenness = metrics.get('betweenness_centrality', {})
+            self._betw = np.fromiter((betweenness.get(node, 0.0) for node in nodes), dtype=np.float64, count=n)
+        self._clust = np.fromiter((clustering.get(node, 0.0) for node in nodes), dtype=np.float64, count=n)
+
+        large_cities = set(self.config['geospatial']['large_cities'])
+        small_cities = set(self.config['geospatial']['small_cities'])
+        self._city_by_id = nx.get_node_attributes(graph, 'city')
+        cities = [self._city_by_id.get(node, '') for node in nodes]
+        self._city_is_large = np.fromiter((city in large_cities for city in cities), dtype=bool, count=n)
+        self._city_is_small = np.fromiter((city in small_cities for city in cities), dtype=bool, count=n)
+
+    def _neighbor_set(self, node_id):
+        cached = self._neighbor_sets.get(node_id)
+        if cached is None:
+            cached = frozenset(self.analyzer.get_neighbors(node_id))
+            self._neighbor_sets[node_id] = cached
+        return cached
+
     def detect_all_patterns(self):
         print("\nCRIMINAL NETWORK DETECTION\n")
 
@@ -28,14 +136,23 @@ class CriminalNetworkDetector:
 
         print(f"\nAnalyzing {len(self.employee_candidates)} employee candidates\n")
 
-        for emp_id, emp_score in self.employee_candidates[:5]:
+        top_candidates = self.employee_candidates[:5]
+
+        if len(top_candidates) < 2:
+            analyses = [_analyze_employee(self, emp_id) for emp_id, _ in top_candidates]
+        else:
+            with ProcessPoolExecutor(max_workers=len(top_candidates)) as pool:
+                analyses = list(pool.map(_analyze_employee,
+                                         [self] * len(top_candidates),
+                                         [emp_id for emp_id, _ in top_candidates]))
+
+        for emp_id, scenario_a_results, scenario_b_result, output in analyses:
             print(f"\nCandidate: {self.analyzer.graph.nodes[emp_id]['name']} (ID: {emp_id})")
+            print(output, end='')
 
-            scenario_a_results = self.detect_scenario_a(emp_id)
             if scenario_a_results:
                 results['scenario_a'][emp_id] = scenario_a_results
 
-            scenario_b_result = self.detect_scenario_b(emp_id)
             if scenario_b_result:
                 results['scenario_b'][emp_id] = scenario_b_result
 
@@ -50,18 +167,20 @@ class CriminalNetworkDetector:
         min_contacts = expected_contacts - tolerance
         max_contacts = expected_contacts + tolerance
 
-        candidates = []
+        degree_score = 1.0 / (1.0 + np.abs(self._deg - expected_contacts))
+        scores = (degree_score * 0.4
+                  + 0.3 * self._city_is_large
+                  + 0.2 * ((self._betw > 0.001) & (self._betw < 0.05))
+                  + 0.1 * ((self._clust > 0.2) & (self._clust < 0.6)))
 
-        for node in self.analyzer.graph.nodes():
-            degree = self.analyzer.graph.degree(node)
+        mask = (self._deg >= min_contacts) & (self._deg <= max_contacts)
+        candidates = [(self._nodes[i], float(scores[i])) for i in np.nonzero(mask)[0]]
+        num_in_range = len(candidates)
 
-            if min_contacts <= degree <= max_contacts:
-                score = self._calculate_employee_score(node, degree, expected_contacts)
-                candidates.append((node, score))
+        # Only the top 10 are ever consumed (5 analyzed, 10 printed).
+        candidates = heapq.nlargest(10, candidates, key=lambda x: x[1])
 
-        candidates.sort(key=lambda x: x[1], reverse=True)
-
-        print(f"Found {len(candidates)} employee candidates with approx 40 contacts\n")
+        print(f"Found {num_in_range} employee candidates with approx 40 contacts\n")
 
         print("Top 10 Employee Candidates:")
         for i, (node_id, score) in enumerate(candidates[:10], 1):
@@ -71,51 +190,52 @@ class CriminalNetworkDetector:
 
         return candidates
 
-    def _calculate_employee_score(self, node_id, degree, expected_degree):
-        score = 0.0
-
-        degree_diff = abs(degree - expected_degree)
-        degree_score = 1.0 / (1.0 + degree_diff)
-        score += degree_score * 0.4
-
-        city = self.analyzer.graph.nodes[node_id].get('city', '')
-        large_cities = self.config['geospatial']['large_cities']
-        if city in large_cities:
-            score += 0.3
-
-        betweenness = self.analyzer.metrics['betweenness_centrality'].get(node_id, 0)
-        if 0.001 < betweenness < 0.05:
-            score += 0.2
-
-        clustering = self.analyzer.metrics['clustering_coefficient'].get(node_id, 0)
-        if 0.2 < clustering < 0.6:
-            score += 0.1
-
-        return score
-
-    def detect_scenario_a(self, employee_id, verbose=True):
+    def detect_scenario_a(self, employee_id, verbose=True, handlers=None):
         print("Analyzing Scenario A (Single Middleman)")
 
         employee_neighbors = self.analyzer.get_neighbors(employee_id)
-        handler_candidates = self._find_handler_candidates(employee_neighbors)
+        if handlers is not None:
+            handler_candidates = handlers
+        else:
+            handler_candidates = self._find_handler_candidates(employee_neighbors)
 
         if len(handler_candidates) < 3:
             print(f"Not enough handlers ({len(handler_candidates)} < 3)")
             return []
 
         all_valid_results = []
-        handler_combos = list(combinations(handler_candidates[:10], 3))
+        handler_combos = combinations(handler_candidates[:10], 3)
 
         configs_checked = 0
         rejected_self_referential = 0
 
+        # Upper bounds for branch-and-bound: a triple whose best possible score
+        # cannot beat the current 3rd-best result is skipped outright.
+        emp_idx = self._idx[employee_id]
+        employee_bound = (20 if 35 <= self._deg[emp_idx] <= 45 else 0) \
+            + (5 if self._city_is_large[emp_idx] else 0)
+        boris_leader_bound = 15 + 15 + 20 + 5
+        top_scores = []
+
         for handler_combo in handler_combos:
             handler_ids = [h[0] for h in handler_combo]
 
+            handler_bound = 0
+            for handler_id in handler_ids:
+                h_idx = self._idx[handler_id]
+                if 30 <= self._deg[h_idx] <= 40:
+                    handler_bound += 10
+                if self._city_is_large[h_idx]:
+                    handler_bound += 3
+
+            if len(top_scores) == 3 and \
+                    employee_bound + handler_bound + boris_leader_bound < top_scores[0]:
+                continue
+
             potential_boris = []
             for neighbor in employee_neighbors:
                 if neighbor not in handler_ids:
-                    betweenness = self.analyzer.metrics['betweenness_centrality'].get(neighbor, 0)
+                    betweenness = self._betw[self._idx[neighbor]]
                     if betweenness > 0.001:
                         potential_boris.append((neighbor, betweenness))
 
@@ -131,8 +251,9 @@ class CriminalNetworkDetector:
                     rejected_self_referential += 1
                     continue
 
-                boris_degree = self.analyzer.graph.degree(boris_candidate)
-                boris_betweenness = self.analyzer.metrics['betweenness_centrality'].get(boris_candidate, 0)
+                boris_idx = self._idx[boris_candidate]
+                boris_degree = self._deg[boris_idx]
+                boris_betweenness = self._betw[boris_idx]
 
                 if boris_degree > 80 or boris_betweenness < 0.001:
                     continue
@@ -145,6 +266,10 @@ class CriminalNetworkDetector:
                         employee_id, handler_ids, boris_candidate, leader_candidate
                     )
 
+                    heapq.heappush(top_scores, config_score)
+                    if len(top_scores) > 3:
+                        heapq.heappop(top_scores)
+
                     all_valid_results.append({
                         'employee': employee_id,
                         'handlers': handler_ids,
@@ -165,11 +290,14 @@ class CriminalNetworkDetector:
 
         return top_results
 
-    def detect_scenario_b(self, employee_id, verbose=True):
+    def detect_scenario_b(self, employee_id, verbose=True, handlers=None):
         print("Analyzing Scenario B (Three Middlemen)")
 
-        employee_neighbors = self.analyzer.get_neighbors(employee_id)
-        handler_candidates = self._find_handler_candidates(employee_neighbors)
+        if handlers is not None:
+            handler_candidates = handlers
+        else:
+            employee_neighbors = self.analyzer.get_neighbors(employee_id)
+            handler_candidates = self._find_handler_candidates(employee_neighbors)
 
         if len(handler_candidates) < 3:
             print(f"Not enough handlers ({len(handler_candidates)} < 3)")
@@ -197,9 +325,8 @@ class CriminalNetworkDetector:
             if len(middlemen) != 3 or len(set(middlemen)) != 3:
                 continue
 
-            common_leader_neighbors = set(self.analyzer.get_neighbors(middlemen[0]))
-            for m in middlemen[1:]:
-                common_leader_neighbors &= set(self.analyzer.get_neighbors(m))
+            neighbor_sets = sorted((self._neighbor_set(m) for m in middlemen), key=len)
+            common_leader_neighbors = neighbor_sets[0].intersection(*neighbor_sets[1:])
 
             exclude_set = set(handler_ids + [employee_id] + middlemen)
             common_leader_neighbors -= exclude_set
@@ -236,7 +363,7 @@ class CriminalNetworkDetector:
         candidates = []
 
         for node_id in potential_handlers:
-            degree = self.analyzer.graph.degree(node_id)
+            degree = self._deg[self._idx[node_id]]
 
             if (min_contacts - 5) <= degree <= (max_contacts + 5):
                 score = self._calculate_handler_score(node_id, degree)
@@ -244,77 +371,91 @@ class CriminalNetworkDetector:
                     score *= 1.5
                 candidates.append((node_id, score))
 
-        candidates.sort(key=lambda x: x[1], reverse=True)
-        return candidates
+        # Callers only look at the 10 best handler candidates.
+        return heapq.nlargest(10, candidates, key=lambda x: x[1])
 
     def _calculate_handler_score(self, node_id, degree):
-        score = 0.5
-
-        if 25 <= degree <= 45:
-            score += 0.4
-
-        city = self.analyzer.graph.nodes[node_id].get('city', '')
-        if city in self.config['geospatial']['large_cities']:
-            score += 0.2
+        idx = self._idx[node_id]
+        betweenness = self._betw[idx]
 
-        betweenness = self.analyzer.metrics['betweenness_centrality'].get(node_id, 0)
-        if betweenness > 0.005:
-            score += 0.3
-        elif betweenness > 0.001:
-            score += 0.15
-
-        return score
+        return (0.5
+                + 0.4 * (25 <= degree <= 45)
+                + 0.2 * self._city_is_large[idx]
+                + 0.3 * (betweenness > 0.005)
+                + 0.15 * ((betweenness > 0.001) & (betweenness <= 0.005)))
 
     def _find_common_middleman(self, handler_ids):
         if not handler_ids:
             return []
 
-        common = set(self.analyzer.get_neighbors(handler_ids[0]))
+        common = set(self._neighbor_set(handler_ids[0]))
 
         for handler_id in handler_ids[1:]:
-            common &= set(self.analyzer.get_neighbors(handler_id))
+            common &= self._neighbor_set(handler_id)
 
-        common_list = [(node, self.analyzer.metrics['betweenness_centrality'].get(node, 0))
-                       for node in common]
+        common_list = [(node, self._betw[self._idx[node]]) for node in common]
         common_list.sort(key=lambda x: x[1], reverse=True)
 
         return [node for node, _ in common_list]
 
     def _find_best_middleman_for_handler(self, potential_middlemen):
+        cache_key = frozenset(potential_middlemen)
+        if cache_key in self._middleman_cache:
+            return self._middleman_cache[cache_key]
+
+        if _best_middleman_jit is not None:
+            candidate_idx = np.fromiter((self._idx[n] for n in potential_middlemen), dtype=np.int64)
+            best_i = -1
+            if candidate_idx.size:
+                best_i = _best_middleman_jit(candidate_idx, self._deg, self._betw, self._city_is_small)
+            best_candidate = self._nodes[best_i] if best_i >= 0 else None
+            self._middleman_cache[cache_key] = best_candidate
+            return best_candidate
+
         best_candidate = None
         best_score = 0
 
         for node_id in potential_middlemen:
-            degree = self.analyzer.graph.degree(node_id)
-            betweenness = self.analyzer.metrics['betweenness_centrality'].get(node_id, 0)
+            idx = self._idx[node_id]
+            degree = self._deg[idx]
+            betweenness = self._betw[idx]
 
             if 15 <= degree <= 70 and betweenness > 0.005:
-                city = self.analyzer.graph.nodes[node_id].get('city', '')
                 score = betweenness * degree
 
-                if city in self.config['geospatial']['small_cities']:
+                if self._city_is_small[idx]:
                     score *= 1.3
 
                 if score > best_score:
                     best_score = score
                     best_candidate = node_id
 
+        self._middleman_cache[cache_key] = best_candidate
         return best_candidate
 
     def _find_fearless_leader(self, potential_leaders, exclude_ids=None):
         if exclude_ids is None:
             exclude_ids = []
 
-        min_contacts = self.config['network_characteristics']['fearless_leader']['min_contacts']
+        cache_key = (frozenset(potential_leaders), frozenset(exclude_ids))
+        if cache_key in self._leader_cache:
+            return self._leader_cache[cache_key]
 
-        total_nodes = self.analyzer.graph.number_of_nodes()
-        top_2_percent_count = max(1, int(total_nodes * 0.02))
+        min_contacts = self.config['network_characteristics']['fearless_leader']['min_contacts']
 
-        all_degrees = sorted([self.analyzer.graph.degree(n) for n in self.analyzer.graph.nodes()], reverse=True)
-        degree_threshold_top2 = all_degrees[min(top_2_percent_count, len(all_degrees) - 1)]
+        degree_threshold_top2, betweenness_threshold_top2 = self._get_leader_thresholds()
 
-        all_betweenness = sorted(self.analyzer.metrics['betweenness_centrality'].values(), reverse=True)
-        betweenness_threshold_top2 = all_betweenness[min(top_2_percent_count, len(all_betweenness) - 1)]
+        if _best_leader_jit is not None:
+            exclude = set(exclude_ids)
+            candidate_idx = np.fromiter(
+                (self._idx[n] for n in potential_leaders if n not in exclude), dtype=np.int64)
+            best_i = -1
+            if candidate_idx.size:
+                best_i = _best_leader_jit(candidate_idx, self._deg, self._betw, self._city_is_large,
+                                          min_contacts, degree_threshold_top2, betweenness_threshold_top2)
+            best_candidate = self._nodes[best_i] if best_i >= 0 else None
+            self._leader_cache[cache_key] = best_candidate
+            return best_candidate
 
         best_candidate = None
         best_score = 0
@@ -323,45 +464,67 @@ class CriminalNetworkDetector:
             if node_id in exclude_ids:
                 continue
 
-            degree = self.analyzer.graph.degree(node_id)
-            betweenness = self.analyzer.metrics['betweenness_centrality'].get(node_id, 0)
+            idx = self._idx[node_id]
+            degree = self._deg[idx]
+            betweenness = self._betw[idx]
 
             in_top_2_percent = (degree >= degree_threshold_top2) or (betweenness >= betweenness_threshold_top2)
 
             if degree >= min_contacts and in_top_2_percent:
-                city = self.analyzer.graph.nodes[node_id].get('city', '')
-
                 score = degree + betweenness * 1000
 
-                if city in self.config['geospatial']['large_cities']:
+                if self._city_is_large[idx]:
                     score *= 1.2
 
                 if score > best_score:
                     best_score = score
                     best_candidate = node_id
 
+        self._leader_cache[cache_key] = best_candidate
         return best_candidate
 
+    def _get_leader_thresholds(self):
+        if self._leader_thresholds is None:
+            total_nodes = self.analyzer.graph.number_of_nodes()
+            top_2_percent_count = max(1, int(total_nodes * 0.02))
+
+            all_degrees = np.fromiter(
+                (degree for _, degree in self.analyzer.graph.degree()),
+                dtype=np.int64, count=total_nodes)
+            all_betweenness = np.fromiter(
+                self.analyzer.metrics['betweenness_centrality'].values(), dtype=np.float64)
+
+            deg_pos = len(all_degrees) - 1 - min(top_2_percent_count, len(all_degrees) - 1)
+            betw_pos = len(all_betweenness) - 1 - min(top_2_percent_count, len(all_betweenness) - 1)
+
+            self._leader_thresholds = (
+                np.partition(all_degrees, deg_pos)[deg_pos],
+                np.partition(all_betweenness, betw_pos)[betw_pos]
+            )
+
+        return self._leader_thresholds
+
     def _score_scenario_a_configuration(self, employee_id, handler_ids, boris_id, leader_id):
         score = 0.0
 
-        emp_degree = self.analyzer.graph.degree(employee_id)
+        emp_degree = self._deg[self._idx[employee_id]]
         if 35 <= emp_degree <= 45:
             score += 20
 
         for handler_id in handler_ids:
-            handler_degree = self.analyzer.graph.degree(handler_id)
+            handler_degree = self._deg[self._idx[handler_id]]
             if 30 <= handler_degree <= 40:
                 score += 10
 
-        boris_degree = self.analyzer.graph.degree(boris_id)
-        boris_betweenness = self.analyzer.metrics['betweenness_centrality'].get(boris_id, 0)
+        boris_idx = self._idx[boris_id]
+        boris_degree = self._deg[boris_idx]
+        boris_betweenness = self._betw[boris_idx]
         if 20 <= boris_degree <= 50:
             score += 15
         if boris_betweenness > 0.01:
             score += 15
 
-        leader_degree = self.analyzer.graph.degree(leader_id)
+        leader_degree = self._deg[self._idx[leader_id]]
         if leader_degree >= 100:
             score += 20
 
@@ -372,24 +535,25 @@ class CriminalNetworkDetector:
     def _score_scenario_b_configuration(self, employee_id, handler_ids, middlemen_ids, leader_id):
         score = 0.0
 
-        emp_degree = self.analyzer.graph.degree(employee_id)
+        emp_degree = self._deg[self._idx[employee_id]]
         if 35 <= emp_degree <= 45:
             score += 20
 
         for handler_id in handler_ids:
-            handler_degree = self.analyzer.graph.degree(handler_id)
+            handler_degree = self._deg[self._idx[handler_id]]
             if 30 <= handler_degree <= 40:
                 score += 10
 
         for middleman_id in middlemen_ids:
-            m_degree = self.analyzer.graph.degree(middleman_id)
-            m_betweenness = self.analyzer.metrics['betweenness_centrality'].get(middleman_id, 0)
+            m_idx = self._idx[middleman_id]
+            m_degree = self._deg[m_idx]
+            m_betweenness = self._betw[m_idx]
             if 20 <= m_degree <= 60:
                 score += 5
             if m_betweenness > 0.01:
                 score += 5
 
-        leader_degree = self.analyzer.graph.degree(leader_id)
+        leader_degree = self._deg[self._idx[leader_id]]
         if leader_degree >= 100:
             score += 20
 
@@ -400,19 +564,13 @@ class CriminalNetworkDetector:
     def _score_geographic_pattern(self, employee_id, handler_ids, middlemen_ids, leader_id):
         score = 0.0
 
-        large_cities = self.config['geospatial']['large_cities']
-
-        emp_city = self.analyzer.graph.nodes[employee_id].get('city', '')
-        if emp_city in large_cities:
+        if self._city_is_large[self._idx[employee_id]]:
             score += 5
 
-        for handler_id in handler_ids:
-            h_city = self.analyzer.graph.nodes[handler_id].get('city', '')
-            if h_city in large_cities:
-                score += 3
+        handler_idx = [self._idx[handler_id] for handler_id in handler_ids]
+        score += 3.0 * self._city_is_large[handler_idx].sum()
 
-        leader_city = self.analyzer.graph.nodes[leader_id].get('city', '')
-        if leader_city in large_cities:
+        if self._city_is_large[self._idx[leader_id]]:
             score += 5
 
         return score
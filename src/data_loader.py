@@ -1,5 +1,7 @@
-import pandas as pd
 import os
+from collections import defaultdict
+
+import pandas as pd
 
 
 class FlitterDataLoader:
@@ -9,6 +11,9 @@ class FlitterDataLoader:
         self.entities_df = None
         self.locations_df = None
         self.flitter_names_df = None
+        self._entity_by_id = {}
+        self._city_by_id = {}
+        self._people_by_city = {}
 
     def load_all_data(self):
         print("Loading Flitter social network data..")
@@ -25,6 +30,8 @@ class FlitterDataLoader:
         self.flitter_names_df = self._load_flitter_names()
         print(f" Loaded {len(self.flitter_names_df)} Flitter usernames")
 
+        self._build_lookup_tables()
+
         print("Done with data loading!\n")
 
         return {
@@ -36,41 +43,50 @@ class FlitterDataLoader:
 
     def _load_links(self):
         file_path = os.path.join(self.dataset_path, "Links_Table.txt")
-        df = pd.read_csv(file_path, sep='\t', skiprows=2, names=['ID1', 'ID2'])
-        df['ID1'] = df['ID1'].astype(int)
-        df['ID2'] = df['ID2'].astype(int)
-        return df
+        return pd.read_csv(file_path, sep='\t', skiprows=2, names=['ID1', 'ID2'],
+                           dtype={'ID1': 'int64', 'ID2': 'int64'})
 
     def _load_entities(self):
         file_path = os.path.join(self.dataset_path, "Entities_Table.txt")
-        df = pd.read_csv(file_path, sep='\t', skiprows=2, names=['ID', 'Name', 'Type'])
-        df['ID'] = df['ID'].astype(int)
-        return df
+        return pd.read_csv(file_path, sep='\t', skiprows=2, names=['ID', 'Name', 'Type'],
+                           dtype={'ID': 'int64', 'Type': 'category'})
 
     def _load_locations(self):
         file_path = os.path.join(self.dataset_path, "People-Cities.txt")
-        df = pd.read_csv(file_path, sep='\t', skiprows=2, names=['ID', 'City'])
-        df['ID'] = df['ID'].astype(int)
-        df['City'] = df['City'].str.strip()
+        df = pd.read_csv(file_path, sep='\t', skiprows=2, names=['ID', 'City'],
+                         dtype={'ID': 'int64'})
+        # Only a dozen distinct cities, so category codes beat object strings.
+        df['City'] = df['City'].str.strip().astype('category')
         return df
 
     def _load_flitter_names(self):
         file_path = os.path.join(self.dataset_path, "Flitter Names.txt")
-        df = pd.read_csv(file_path, sep='\t', header=None, names=['ID', 'FlitterName'])
-        df['ID'] = df['ID'].astype(int)
-        return df
+        return pd.read_csv(file_path, sep='\t', header=None, names=['ID', 'FlitterName'],
+                           dtype={'ID': 'int64'})
+
+    def _build_lookup_tables(self):
+        self._entity_by_id = {
+            row_id: (name, row_type)
+            for row_id, name, row_type in zip(
+                self.entities_df['ID'], self.entities_df['Name'], self.entities_df['Type'])
+        }
+
+        self._city_by_id = dict(zip(self.locations_df['ID'], self.locations_df['City']))
+
+        self._people_by_city = defaultdict(list)
+        for person_id, city in self._city_by_id.items():
+            self._people_by_city[city].append(person_id)
 
     def get_person_info(self, person_id):
         info = {}
 
-        entity_row = self.entities_df[self.entities_df['ID'] == person_id]
-        if not entity_row.empty:
-            info['name'] = entity_row.iloc[0]['Name']
-            info['type'] = entity_row.iloc[0]['Type']
+        entity = self._entity_by_id.get(person_id)
+        if entity is not None:
+            info['name'], info['type'] = entity
 
-        location_row = self.locations_df[self.locations_df['ID'] == person_id]
-        if not location_row.empty:
-            info['city'] = location_row.iloc[0]['City']
+        city = self._city_by_id.get(person_id)
+        if city is not None:
+            info['city'] = city
 
         return info
 
@@ -78,7 +94,7 @@ class FlitterDataLoader:
         return sorted(self.locations_df['City'].unique().tolist())
 
     def get_people_by_city(self, city):
-        return self.locations_df[self.locations_df['City'] == city]['ID'].tolist()
+        return list(self._people_by_city.get(city, []))
 
     def get_data_summary(self):
         return {
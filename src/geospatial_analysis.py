@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 from collections import Counter
 import yaml
@@ -13,9 +14,14 @@ class GeospatialAnalyzer:
         self.large_cities = set(self.config['geospatial']['large_cities'])
         self.small_cities = set(self.config['geospatial']['small_cities'])
 
-        self.id_to_city = {}
-        for _, row in locations_df.iterrows():
-            self.id_to_city[row['ID']] = row['City']
+        self.id_to_city = dict(zip(locations_df['ID'].to_numpy(), locations_df['City'].to_numpy()))
+
+        self._international_cache = {}
+        self._city_stats = None
+
+        self._graph_ref = None
+        self._node_pos = None
+        self._city_codes = None
 
     def get_city(self, person_id):
         return self.id_to_city.get(person_id, "Unknown")
@@ -27,21 +33,27 @@ class GeospatialAnalyzer:
         return city in self.small_cities
 
     def get_city_statistics(self):
-        city_counts = Counter(self.id_to_city.values())
+        if self._city_stats is not None:
+            return self._city_stats
 
-        stats = {
-            'total_cities': len(city_counts),
-            'city_populations': dict(city_counts),
-            'large_cities': {},
-            'small_cities': {}
-        }
+        city_counts = Counter(self.id_to_city.values())
 
+        large = {}
+        small = {}
         for city, count in city_counts.items():
             if city in self.large_cities:
-                stats['large_cities'][city] = count
+                large[city] = count
             elif city in self.small_cities:
-                stats['small_cities'][city] = count
+                small[city] = count
 
+        stats = {
+            'total_cities': len(city_counts),
+            'city_populations': city_counts,
+            'large_cities': large,
+            'small_cities': small
+        }
+
+        self._city_stats = stats
         return stats
 
     def analyze_network_geography(self, network_nodes):
@@ -93,15 +105,29 @@ class GeospatialAnalyzer:
 
         return analysis
 
+    def _graph_city_codes(self, graph):
+        if self._graph_ref is not graph:
+            nodes = list(graph.nodes())
+            city_ids = {city: i for i, city in enumerate(self.id_to_city.values())}
+            self._node_pos = {node: i for i, node in enumerate(nodes)}
+            self._city_codes = np.fromiter(
+                (city_ids.get(self.id_to_city.get(node), -1) for node in nodes),
+                dtype=np.int64, count=len(nodes))
+            self._graph_ref = graph
+        return self._node_pos, self._city_codes
+
     def find_international_connections(self, graph, node_id):
-        node_city = self.get_city(node_id)
-        different_city_count = 0
+        cached = self._international_cache.get(node_id)
+        if cached is not None:
+            return cached
+
+        pos, codes = self._graph_city_codes(graph)
+        neighbor_pos = np.fromiter(
+            (pos[neighbor] for neighbor in graph.neighbors(node_id)), dtype=np.int64)
 
-        for neighbor in graph.neighbors(node_id):
-            neighbor_city = self.get_city(neighbor)
-            if neighbor_city != node_city:
-                different_city_count += 1
+        different_city_count = int((codes[neighbor_pos] != codes[pos[node_id]]).sum())
 
+        self._international_cache[node_id] = different_city_count
         return different_city_count
 
     def get_city_diversity_score(self, node_ids):
@@ -1,68 +1,255 @@
+import hashlib
+import os
+import random
+from multiprocessing import Pool
+
+import joblib
 import networkx as nx
+import numpy as np
 import pandas as pd
-import community as community_louvain
+import yaml
+
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+
+
+if njit is not None:
+    @njit(parallel=True, cache=True)
+    def _batch_centralities(indptr, indices, sources, n):
+        # One BFS per source feeds both the Brandes betweenness accumulation
+        # and the distance sums used for sampled closeness, so the adjacency
+        # is walked once per source instead of once per metric. Sources run
+        # in parallel with per-iteration work arrays; the shared accumulators
+        # are only touched through whole-array reductions.
+        bc = np.zeros(n)
+        sum_dist = np.zeros(n, dtype=np.int64)
+        reached = np.zeros(n, dtype=np.int64)
+
+        for si in prange(sources.shape[0]):
+            s = sources[si]
+            dist = np.full(n, -1, dtype=np.int64)
+            sigma = np.zeros(n)
+            delta = np.zeros(n)
+            order = np.empty(n, dtype=np.int64)
+            dist[s] = 0
+            sigma[s] = 1.0
+            order[0] = s
+            head = 0
+            tail = 1
+
+            while head < tail:
+                v = order[head]
+                head += 1
+                dv = dist[v]
+                for ei in range(indptr[v], indptr[v + 1]):
+                    w = indices[ei]
+                    if dist[w] < 0:
+                        dist[w] = dv + 1
+                        order[tail] = w
+                        tail += 1
+                    if dist[w] == dv + 1:
+                        sigma[w] += sigma[v]
+
+            local_bc = np.zeros(n)
+            local_sum = np.zeros(n, dtype=np.int64)
+            local_reached = np.zeros(n, dtype=np.int64)
+
+            for i in range(tail):
+                v = order[i]
+                local_sum[v] = dist[v]
+                local_reached[v] = 1
+
+            for i in range(tail - 1, 0, -1):
+                w = order[i]
+                coeff = (1.0 + delta[w]) / sigma[w]
+                dw = dist[w]
+                for ei in range(indptr[w], indptr[w + 1]):
+                    v = indices[ei]
+                    if dist[v] == dw - 1:
+                        delta[v] += sigma[v] * coeff
+                local_bc[w] = delta[w]
+
+            bc += local_bc
+            sum_dist += local_sum
+            reached += local_reached
+
+        return bc, sum_dist, reached
+else:
+    _batch_centralities = None
+
+
+_memory = joblib.Memory('.cache', verbose=0)
+
+
+def graph_fingerprint(graph):
+    # Content hash of the edge list, used to key the on-disk joblib cache so
+    # a stale entry is never served for a different graph.
+    edges = np.array([(u, v) if u <= v else (v, u) for u, v in graph.edges()],
+                     dtype=np.int32).reshape(-1, 2)
+    edges = edges[np.lexsort((edges[:, 1], edges[:, 0]))]
+    return hashlib.sha1(np.ascontiguousarray(edges)).hexdigest()
+
+
+@_memory.cache(ignore=['compute'])
+def _cached_metrics(edge_hash, backend, approx, samples, compute=None):
+    return compute()
+
+
+def _betweenness_partial(graph, sources):
+    from networkx.algorithms.centrality.betweenness import (
+        _accumulate_basic, _single_source_shortest_path_basic)
+
+    betweenness = dict.fromkeys(graph, 0.0)
+    for s in sources:
+        S, P, sigma, _ = _single_source_shortest_path_basic(graph, s)
+        betweenness, _ = _accumulate_basic(betweenness, S, P, sigma, s)
+
+    return betweenness
 
 
 class SocialNetworkAnalyzer:
-    def __init__(self, links_df: pd.DataFrame, entities_df: pd.DataFrame, locations_df: pd.DataFrame):
+    def __init__(self, links_df: pd.DataFrame, entities_df: pd.DataFrame, locations_df: pd.DataFrame,
+                 backend='networkx', config_path="config/analysis_config.yaml"):
         self.links_df = links_df
         self.entities_df = entities_df
         self.locations_df = locations_df
+        self.backend = backend
+
+        try:
+            with open(config_path, 'r') as f:
+                config = yaml.safe_load(f)
+        except FileNotFoundError:
+            config = {}
+        self.betweenness_samples = config.get('analysis', {}).get('betweenness_samples', 256)
+
         self.graph = None
         self.metrics = {}
+        self.betweenness_array = None
+        self.node_index = None
+        self._node_info = {}
+        self._csr_cache = None
+        self._sorted_metrics = {}
+        self._by_degree = {}
+        self._degree_range_cache = {}
+        self._network_summary = None
+        self._degree_by_node = {}
+        self._neighbor_sets = {}
+        self._closeness_from_batch = None
+        self._edge_hash = None
 
     def build_graph(self):
         print("Now I'm building social network graph...")
 
         self.graph = nx.Graph()
 
-        for _, row in self.entities_df.iterrows():
-            node_id = row['ID']
-            self.graph.add_node(
-                node_id,
-                name=row['Name'],
-                type=row['Type']
-            )
+        self.graph.add_nodes_from(
+            (node_id, {'name': name, 'type': node_type})
+            for node_id, name, node_type in
+            self.entities_df[['ID', 'Name', 'Type']].itertuples(index=False, name=None))
 
-        for _, row in self.locations_df.iterrows():
-            node_id = row['ID']
-            if node_id in self.graph.nodes:
-                self.graph.nodes[node_id]['city'] = row['City']
+        # set_node_attributes ignores ids that are not in the graph, matching
+        # the old membership check.
+        cities = dict(zip(self.locations_df['ID'], self.locations_df['City']))
+        nx.set_node_attributes(self.graph, cities, 'city')
 
-        for _, row in self.links_df.iterrows():
-            self.graph.add_edge(row['ID1'], row['ID2'])
+        self.graph.add_edges_from(
+            self.links_df[['ID1', 'ID2']].itertuples(index=False, name=None))
+
+        self._by_degree = {}
+        self._degree_range_cache = {}
+        self._network_summary = None
+        self._degree_by_node = dict(self.graph.degree())
+        for node, degree in self._degree_by_node.items():
+            self._by_degree.setdefault(degree, []).append(node)
+
+        self._neighbor_sets = {node: frozenset(adj) for node, adj in self.graph.adjacency()}
+        self._edge_hash = graph_fingerprint(self.graph)
 
         print(f" Graph created with {self.graph.number_of_nodes()} nodes and {self.graph.number_of_edges()} edges\n")
 
         return self.graph
 
-    def calculate_all_metrics(self):
+    def calculate_all_metrics(self, approx=False, samples=None):
         print("Calculating network metrics...")
 
+        if samples is None:
+            samples = self.betweenness_samples
+
+        # The metrics only depend on the edge list and the sampling settings,
+        # so repeat runs on an unchanged graph load the pickled result from
+        # .cache instead of recomputing.
+        self.metrics = _cached_metrics(
+            self._edge_hash, self.backend, approx, samples,
+            compute=lambda: self._compute_all_metrics(approx, samples))
+
+        _, _, nodes, node_index = self._csr()
+        self.node_index = node_index
+        self.betweenness_array = np.fromiter(
+            (self.metrics['betweenness_centrality'].get(node, 0.0) for node in nodes),
+            dtype=np.float64, count=len(nodes))
+
+        self._node_info = {node: self._build_node_info(node) for node in self.graph.nodes()}
+        self._sorted_metrics = {}
+
+        print("Calculation done for all the metrices\n")
+
+        return self.metrics
+
+    def _compute_all_metrics(self, approx, samples):
         print(" Computing degree centrality...")
         degree_centrality = nx.degree_centrality(self.graph)
 
+        backend_metrics = {}
+        if self.backend == 'networkit':
+            backend_metrics = self._calc_metrics_networkit(approx, samples) or {}
+        elif self.backend == 'igraph':
+            backend_metrics = self._calc_metrics_igraph() or {}
+
         print(" Computing betweenness centrality (using approximation for speed)...")
-        k_sample = min(500, self.graph.number_of_nodes())
-        betweenness_centrality = nx.betweenness_centrality(self.graph, k=k_sample)
+        self._closeness_from_batch = None
+        betweenness_centrality = backend_metrics.get('betweenness_centrality')
+        if betweenness_centrality is None:
+            k_sample = min(samples if approx else 500, self.graph.number_of_nodes())
+            betweenness_centrality = self._betweenness_sampled(k_sample)
 
         print(" Computing closeness centrality...")
-        closeness_centrality = nx.closeness_centrality(self.graph)
+        closeness_centrality = backend_metrics.get('closeness_centrality')
+        if closeness_centrality is None:
+            if approx and self._closeness_from_batch is not None:
+                closeness_centrality = self._closeness_from_batch
+            elif approx:
+                closeness_centrality = self._approx_closeness()
+            else:
+                closeness_centrality = nx.closeness_centrality(self.graph)
 
         print(" Computing eigenvector centrality...")
-        try:
-            eigenvector_centrality = nx.eigenvector_centrality(self.graph, max_iter=1000)
-        except:
-            eigenvector_centrality = {}
-            print(" (Eigenvector centrality calculation did not converge)")
+        eigenvector_centrality = backend_metrics.get('eigenvector_centrality')
+        if eigenvector_centrality is None:
+            try:
+                # ARPACK on the sparse adjacency instead of the pure-Python
+                # power iteration, which was slow and often failed to converge.
+                eigenvector_centrality = nx.eigenvector_centrality_numpy(
+                    self.graph, max_iter=200, tol=1e-6)
+            except:
+                eigenvector_centrality = {}
+                print(" (Eigenvector centrality calculation did not converge)")
 
         print(" Computing clustering coefficients...")
-        clustering_coef = nx.clustering(self.graph)
+        clustering_coef = backend_metrics.get('clustering_coefficient')
+        if clustering_coef is None:
+            clustering_coef = nx.clustering(self.graph)
 
         print(" Detecting communities...")
-        communities = community_louvain.best_partition(self.graph)
-
-        self.metrics = {
+        communities = backend_metrics.get('communities')
+        if communities is None:
+            # networkx's Louvain applies incremental delta-modularity updates,
+            # unlike python-louvain which rescans modularity per move.
+            partition = nx.algorithms.community.louvain_communities(self.graph)
+            communities = {node: i for i, members in enumerate(partition) for node in members}
+
+        return {
             'degree_centrality': degree_centrality,
             'betweenness_centrality': betweenness_centrality,
             'closeness_centrality': closeness_centrality,
@@ -71,41 +258,247 @@ class SocialNetworkAnalyzer:
             'communities': communities
         }
 
-        print("Calculation done for all the metrices\n")
+    def _csr(self):
+        if self._csr_cache is None:
+            nodes = list(self.graph.nodes())
+            index = {node: i for i, node in enumerate(nodes)}
 
-        return self.metrics
+            degrees = np.array([self.graph.degree(node) for node in nodes], dtype=np.int64)
+            indptr = np.zeros(len(nodes) + 1, dtype=np.int64)
+            np.cumsum(degrees, out=indptr[1:])
+
+            indices = np.empty(indptr[-1], dtype=np.int64)
+            fill = 0
+            for node in nodes:
+                for neighbor in self.graph.neighbors(node):
+                    indices[fill] = index[neighbor]
+                    fill += 1
+
+            self._csr_cache = (indptr, indices, nodes, index)
+
+        return self._csr_cache
+
+    def _approx_closeness(self, k=200):
+        # Eppstein-Wang estimate: BFS from k sampled sources instead of all n.
+        nodes = list(self.graph)
+        n = len(nodes)
+        k = min(k, n)
+        sources = random.sample(nodes, k)
+
+        sum_dist = dict.fromkeys(nodes, 0)
+        reached = dict.fromkeys(nodes, 0)
+        for source in sources:
+            for node, dist in nx.single_source_shortest_path_length(self.graph, source).items():
+                sum_dist[node] += dist
+                reached[node] += 1
+
+        # reached/k estimates the fraction of the graph in a node's component,
+        # giving the same component scaling nx.closeness_centrality applies.
+        # Exact (up to sampling) when k == n on a connected graph.
+        closeness = {}
+        for node in nodes:
+            total = sum_dist[node]
+            closeness[node] = (
+                reached[node] * reached[node] * (n - 1) / (k * n * total) if total > 0 else 0.0)
+
+        return closeness
+
+    def _betweenness_sampled(self, k_sample):
+        if _batch_centralities is None:
+            return self._betweenness_sampled_parallel(k_sample)
+
+        indptr, indices, nodes, _ = self._csr()
+        n = len(nodes)
+
+        sources = np.array(random.sample(range(n), k_sample), dtype=np.int64)
+        bc, sum_dist, reached = _batch_centralities(indptr, indices, sources, n)
+
+        if n > 2:
+            bc *= (n / k_sample) / ((n - 1) * (n - 2))
+
+        # Same estimator as _approx_closeness, fed by the batched BFS pass.
+        closeness = np.zeros(n)
+        nonzero = sum_dist > 0
+        closeness[nonzero] = (reached[nonzero].astype(np.float64) ** 2 * (n - 1)
+                              / (k_sample * n * sum_dist[nonzero]))
+        self._closeness_from_batch = {node: closeness[i] for i, node in enumerate(nodes)}
+
+        return {node: bc[i] for i, node in enumerate(nodes)}
+
+    def _betweenness_sampled_parallel(self, k_sample):
+        n = self.graph.number_of_nodes()
+        processes = min(os.cpu_count() or 1, k_sample)
+
+        if processes < 2:
+            return nx.betweenness_centrality(self.graph, k=k_sample)
+
+        sources = random.sample(list(self.graph.nodes()), k_sample)
+        chunks = [chunk.tolist() for chunk in np.array_split(sources, processes)]
+
+        with Pool(processes=processes) as pool:
+            partials = pool.starmap(_betweenness_partial, [(self.graph, chunk) for chunk in chunks])
+
+        betweenness = dict.fromkeys(self.graph, 0.0)
+        for partial in partials:
+            for node, value in partial.items():
+                betweenness[node] += value
+
+        if n > 2:
+            scale = (n / k_sample) / ((n - 1) * (n - 2))
+            for node in betweenness:
+                betweenness[node] *= scale
+
+        return betweenness
+
+    def _calc_metrics_networkit(self, approx=False, samples=256):
+        try:
+            import networkit as nk
+        except ImportError:
+            print(" (networkit not installed, using default backend)")
+            return None
+
+        _, _, nodes, index = self._csr()
+
+        nk_graph = nk.Graph(len(nodes))
+        for u, v in self.graph.edges():
+            nk_graph.addEdge(index[u], index[v])
+
+        if approx:
+            betweenness = nk.centrality.EstimateBetweenness(
+                nk_graph, nSamples=samples, normalized=True, parallel=True).run().scores()
+        else:
+            betweenness = nk.centrality.Betweenness(nk_graph, normalized=True).run().scores()
+        closeness = nk.centrality.Closeness(nk_graph, True, False).run().scores()
+
+        return {
+            'betweenness_centrality': {node: betweenness[i] for i, node in enumerate(nodes)},
+            'closeness_centrality': {node: closeness[i] for i, node in enumerate(nodes)}
+        }
+
+    def _calc_metrics_igraph(self):
+        try:
+            import igraph
+        except ImportError:
+            print(" (python-igraph not installed, using default backend)")
+            return None
+
+        _, _, nodes, index = self._csr()
+        n = len(nodes)
+
+        ig = igraph.Graph(n=n, edges=[(index[u], index[v]) for u, v in self.graph.edges()])
+
+        # igraph betweenness is unnormalized; rescale to match networkx.
+        scale = 2.0 / ((n - 1) * (n - 2)) if n > 2 else 0.0
+        betweenness = [b * scale for b in ig.betweenness()]
+        closeness = ig.closeness()
+        eigenvector = ig.eigenvector_centrality()
+        clustering = ig.transitivity_local_undirected(mode='zero')
+        communities = ig.community_multilevel().membership
+
+        def as_node_dict(scores):
+            return {node: scores[i] for i, node in enumerate(nodes)}
+
+        return {
+            'betweenness_centrality': as_node_dict(betweenness),
+            'closeness_centrality': as_node_dict(closeness),
+            'eigenvector_centrality': as_node_dict(eigenvector),
+            'clustering_coefficient': as_node_dict(clustering),
+            'communities': as_node_dict(communities)
+        }
 
     def get_node_degree(self, node_id):
-        return self.graph.degree(node_id)
+        return self._degree_by_node.get(node_id, 0)
 
     def get_neighbors(self, node_id):
         return list(self.graph.neighbors(node_id))
 
     def get_nodes_by_degree_range(self, min_degree, max_degree):
+        cached = self._degree_range_cache.get((min_degree, max_degree))
+        if cached is not None:
+            return cached
+
+        highest = max(self._by_degree, default=0)
+
         nodes = []
-        for node in self.graph.nodes():
-            degree = self.graph.degree(node)
-            if min_degree <= degree <= max_degree:
+        for degree in range(min(max_degree, highest), min_degree - 1, -1):
+            for node in self._by_degree.get(degree, ()):
                 nodes.append((node, degree))
 
-        return sorted(nodes, key=lambda x: x[1], reverse=True)
+        self._degree_range_cache[(min_degree, max_degree)] = nodes
+        return nodes
 
     def get_common_neighbors(self, node1, node2):
-        neighbors1 = set(self.graph.neighbors(node1))
-        neighbors2 = set(self.graph.neighbors(node2))
-        return list(neighbors1.intersection(neighbors2))
+        return list(self._neighbor_sets[node1] & self._neighbor_sets[node2])
 
-    def find_paths_between_nodes(self, source, target, max_length=5):
+    def find_paths_between_nodes(self, source, target, max_length=5, bidirectional=True):
         try:
+            if bidirectional:
+                return self._bidirectional_simple_paths(source, target, max_length)
             paths = list(nx.all_simple_paths(self.graph, source, target, cutoff=max_length))
             return paths
         except:
             return []
 
+    def _bidirectional_simple_paths(self, source, target, cutoff):
+        # Meet in the middle: enumerate simple paths to half depth from both
+        # ends and stitch them together, so the search fans out b^(L/2) twice
+        # instead of b^L once.
+        def half_paths(start, depth):
+            by_end = {}
+            stack = [(start, [start])]
+            while stack:
+                node, path = stack.pop()
+                by_end.setdefault(node, []).append(path)
+                if len(path) - 1 < depth:
+                    for neighbor in self._neighbor_sets[node]:
+                        if neighbor not in path:
+                            stack.append((neighbor, path + [neighbor]))
+            return by_end
+
+        forward = half_paths(source, (cutoff + 1) // 2)
+        backward = half_paths(target, cutoff // 2)
+
+        paths = []
+        for meet, fwd_paths in forward.items():
+            bwd_paths = backward.get(meet)
+            if bwd_paths is None:
+                continue
+            for fwd in fwd_paths:
+                fwd_len = len(fwd) - 1
+                if fwd_len == 0 and meet != target:
+                    continue
+                fwd_set = set(fwd)
+                for bwd in bwd_paths:
+                    # A path of length L is split once, at ceil(L/2), so each
+                    # forward half only pairs with backward halves one step
+                    # shorter or equal.
+                    bwd_len = len(bwd) - 1
+                    if bwd_len != fwd_len and bwd_len != fwd_len - 1:
+                        continue
+                    if fwd_len + bwd_len == 0:
+                        continue
+                    if len(fwd_set.intersection(bwd)) != 1:
+                        continue
+                    paths.append(fwd + bwd[-2::-1])
+
+        return paths
+
     def get_node_info(self, node_id):
+        cached = self._node_info.get(node_id)
+        if cached is not None:
+            return cached
+
         if node_id not in self.graph.nodes:
             return {}
 
+        info = self._build_node_info(node_id)
+        self._node_info[node_id] = info
+        return info
+
+    def get_nodes_info(self, node_ids):
+        return [self.get_node_info(node_id) for node_id in node_ids]
+
+    def _build_node_info(self, node_id):
         info = {
             'id': node_id,
             'name': self.graph.nodes[node_id].get('name', 'Unknown'),
@@ -127,27 +520,51 @@ class SocialNetworkAnalyzer:
         if metric_name not in self.metrics:
             return []
 
-        metric_data = self.metrics[metric_name]
-        sorted_nodes = sorted(metric_data.items(), key=lambda x: x[1], reverse=True)
+        sorted_nodes = self._sorted_metrics.get(metric_name)
+        if sorted_nodes is None:
+            metric_data = self.metrics[metric_name]
+            sorted_nodes = sorted(metric_data.items(), key=lambda x: x[1], reverse=True)
+            self._sorted_metrics[metric_name] = sorted_nodes
 
         return sorted_nodes[:top_n]
 
     def analyze_subgraph(self, node_ids):
         subgraph = self.graph.subgraph(node_ids)
 
+        connected = nx.is_connected(subgraph)
+
         analysis = {
             'num_nodes': subgraph.number_of_nodes(),
             'num_edges': subgraph.number_of_edges(),
             'density': nx.density(subgraph),
-            'is_connected': nx.is_connected(subgraph)
+            'is_connected': connected
         }
 
-        if nx.is_connected(subgraph):
-            analysis['diameter'] = nx.diameter(subgraph)
-            analysis['avg_shortest_path_length'] = nx.average_shortest_path_length(subgraph)
+        if connected:
+            diameter, avg_path_length = self._path_length_stats(subgraph)
+            analysis['diameter'] = diameter
+            analysis['avg_shortest_path_length'] = avg_path_length
 
         return analysis
 
+    @staticmethod
+    def _path_length_stats(graph):
+        # Derive diameter and average shortest path length from one compiled
+        # all-pairs pass over the sparse adjacency instead of per-source
+        # Python BFS. Only called on connected graphs, so every distance is
+        # finite.
+        from scipy.sparse.csgraph import shortest_path
+
+        adjacency = nx.to_scipy_sparse_array(graph, format='csr')
+        # csgraph's compiled routines expect 32-bit index arrays.
+        adjacency.indptr = adjacency.indptr.astype(np.int32)
+        adjacency.indices = adjacency.indices.astype(np.int32)
+        dist = shortest_path(adjacency, method='D', unweighted=True, directed=False)
+
+        n = graph.number_of_nodes()
+        diameter = int(dist.max()) if n > 1 else 0
+        return diameter, float(dist.sum()) / (n * (n - 1)) if n > 1 else 0.0
+
     def find_bridges(self):
         return list(nx.bridges(self.graph))
 
@@ -155,18 +572,31 @@ class SocialNetworkAnalyzer:
         return list(nx.articulation_points(self.graph))
 
     def get_network_summary(self):
+        if self._network_summary is not None:
+            return self._network_summary
+
+        connected = nx.is_connected(self.graph)
+
+        clustering = self.metrics.get('clustering_coefficient')
+        if clustering:
+            avg_clustering = sum(clustering.values()) / self.graph.number_of_nodes()
+        else:
+            avg_clustering = nx.average_clustering(self.graph)
+
         summary = {
             'num_nodes': self.graph.number_of_nodes(),
             'num_edges': self.graph.number_of_edges(),
             'density': nx.density(self.graph),
-            'is_connected': nx.is_connected(self.graph),
+            'is_connected': connected,
             'num_connected_components': nx.number_connected_components(self.graph),
-            'avg_degree': sum(dict(self.graph.degree()).values()) / self.graph.number_of_nodes(),
-            'avg_clustering': nx.average_clustering(self.graph)
+            'avg_degree': 2 * self.graph.number_of_edges() / self.graph.number_of_nodes(),
+            'avg_clustering': avg_clustering
         }
 
-        if nx.is_connected(self.graph):
-            summary['diameter'] = nx.diameter(self.graph)
-            summary['avg_shortest_path_length'] = nx.average_shortest_path_length(self.graph)
+        if connected:
+            diameter, avg_path_length = self._path_length_stats(self.graph)
+            summary['diameter'] = diameter
+            summary['avg_shortest_path_length'] = avg_path_length
 
+        self._network_summary = summary
         return summary